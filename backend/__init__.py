@@ -8,6 +8,7 @@ __version__ = "1.0.0"
 from backend.api import router
 from backend.auth import (
     get_current_user,
+    get_current_user_light,
     get_current_active_user,
     get_password_hash,
     verify_password,
@@ -26,6 +27,7 @@ from backend.database import get_db, init_db
 __all__ = [
     "router",
     "get_current_user",
+    "get_current_user_light",
     "get_current_active_user",
     "get_password_hash",
     "verify_password",
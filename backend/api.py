@@ -3,78 +3,131 @@ SVV-LoginPage API Routes
 Authentication endpoints for login, register, and user management
 """
 
-from datetime import datetime, timedelta, timezone
-from typing import Dict, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Response, Cookie
+import heapq
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+from cachetools import TTLCache
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Cookie
+from fastapi.responses import ORJSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError, DataError, SQLAlchemyError
 
-from backend.auth import authenticate_user, create_access_token, get_current_active_user, get_password_hash
+from backend.auth import (
+    authenticate_user,
+    create_access_token,
+    get_current_active_user,
+    get_current_user_light,
+    get_password_hash,
+    get_user_for_token,
+    invalidate_cached_user,
+    oauth2_scheme,
+    revoke_token,
+)
 from backend.config import settings
 from backend.database import get_db
 from backend.models import User
-from backend.schemas import Token, UserCreate, UserResponse, UserUpdate
+from backend.schemas import Token, TokenData, UserCreate, UserResponse, UserUpdate
 
 router = APIRouter(
     prefix="/api/auth",
     tags=["authentication"],
     responses={401: {"description": "Unauthorized"}},
+    default_response_class=ORJSONResponse,
 )
 
+# Token lifetime, bound once at import instead of read from settings per request
+ACCESS_TOKEN_EXPIRES = timedelta(minutes=settings.access_token_expire_minutes)
+ACCESS_TOKEN_MAX_AGE_SECONDS = settings.access_token_expire_minutes * 60
+
+# (ETag, serialized body) of /users/me keyed by (user_id, token_version)
+user_response_cache: TTLCache = TTLCache(maxsize=512, ttl=5)
+USERS_ME_CACHE_CONTROL = "private, max-age=5"
+
 # Rate limiting for login attempts by username (not IP)
 # This prevents attackers from bypassing lockout by rotating IPs
 # and ensures each account is protected individually
-failed_login_attempts: Dict[str, Dict] = {}
+failed_login_attempts: "Dict[str, _Attempt]" = {}
 MAX_LOGIN_ATTEMPTS = 5
 LOCKOUT_DURATION_MINUTES = 1
 MAX_TRACKED_USERS = 10000  # Limit memory usage
+# Lockout deadlines are stored as integer unix-ns timestamps (time.time_ns())
+LOCKOUT_DURATION_NS = LOCKOUT_DURATION_MINUTES * 60 * 1_000_000_000
+
+# Min-heap of (locked_until, identifier) so cleanup only touches expired lockouts
+_expiry_heap: List[Tuple[int, str]] = []
+# Identifiers without an active lockout, oldest first (eviction order on overflow)
+_unlocked_attempts: "OrderedDict[str, None]" = OrderedDict()
+
+# Cleanup runs at most once per interval; lockouts last minutes, so 1s precision is plenty
+_CLEANUP_INTERVAL_NS = 1_000_000_000
+_last_cleanup_ns = 0
+
+
+@dataclass(slots=True)
+class _Attempt:
+    """Failed-login state for one identifier
+
+    Attributes:
+        count: Number of consecutive failed attempts
+        locked_until: Lockout deadline as unix-ns (0 when not locked)
+    """
+    count: int = 0
+    locked_until: int = 0
 
 
 def cleanup_expired_attempts():
     """Periodically clean up expired login attempt records"""
-    now = datetime.now(timezone.utc)
-    expired_keys = []
-    for identifier, attempt_info in failed_login_attempts.items():
-        locked_until = attempt_info.get("locked_until")
-        if locked_until and now > locked_until:
-            expired_keys.append(identifier)
-    for key in expired_keys:
-        del failed_login_attempts[key]
-    
-    # If still too many entries, remove oldest ones
-    if len(failed_login_attempts) > MAX_TRACKED_USERS:
-        # Remove entries that don't have active lockouts
-        for identifier in list(failed_login_attempts.keys()):
-            if not failed_login_attempts[identifier].get("locked_until"):
-                del failed_login_attempts[identifier]
-            if len(failed_login_attempts) <= MAX_TRACKED_USERS:
-                break
+    global _last_cleanup_ns
+    now_ns = time.monotonic_ns()
+    if now_ns - _last_cleanup_ns < _CLEANUP_INTERVAL_NS:
+        return
+    _last_cleanup_ns = now_ns
+
+    now = time.time_ns()
+    while _expiry_heap and _expiry_heap[0][0] < now:
+        locked_until, identifier = heapq.heappop(_expiry_heap)
+        attempt = failed_login_attempts.get(identifier)
+        # Skip stale heap entries left behind by a cleared or re-locked identifier
+        if attempt is not None and attempt.locked_until == locked_until:
+            del failed_login_attempts[identifier]
+
+    # If still too many entries, remove oldest ones without active lockouts
+    while len(failed_login_attempts) > MAX_TRACKED_USERS and _unlocked_attempts:
+        identifier, _ = _unlocked_attempts.popitem(last=False)
+        failed_login_attempts.pop(identifier, None)
 
 
 def check_login_lockout(identifier: str) -> bool:
     """Check if identifier is locked out due to failed login attempts"""
     cleanup_expired_attempts()
-    if identifier in failed_login_attempts:
-        attempt_info = failed_login_attempts[identifier]
-        if attempt_info.get("locked_until"):
-            if datetime.now(timezone.utc) < attempt_info["locked_until"]:
-                return True
-            else:
-                # Lock expired, reset
-                del failed_login_attempts[identifier]
+    attempt = failed_login_attempts.get(identifier)
+    if attempt is not None and attempt.locked_until:
+        if time.time_ns() < attempt.locked_until:
+            return True
+        # Lock expired, reset
+        del failed_login_attempts[identifier]
     return False
 
 
 def record_failed_login(identifier: str):
     """Record failed login attempt for rate limiting"""
-    if identifier not in failed_login_attempts:
-        failed_login_attempts[identifier] = {"count": 0, "locked_until": None}
-    
-    failed_login_attempts[identifier]["count"] += 1
-    
-    if failed_login_attempts[identifier]["count"] >= MAX_LOGIN_ATTEMPTS:
-        failed_login_attempts[identifier]["locked_until"] = datetime.now(timezone.utc) + timedelta(minutes=LOCKOUT_DURATION_MINUTES)
+    attempt = failed_login_attempts.get(identifier)
+    if attempt is None:
+        attempt = failed_login_attempts[identifier] = _Attempt()
+        _unlocked_attempts[identifier] = None
+
+    attempt.count += 1
+
+    if attempt.count >= MAX_LOGIN_ATTEMPTS:
+        attempt.locked_until = time.time_ns() + LOCKOUT_DURATION_NS
+        heapq.heappush(_expiry_heap, (attempt.locked_until, identifier))
+        _unlocked_attempts.pop(identifier, None)
 
 
 def clear_failed_login(identifier: str):
@@ -86,13 +139,23 @@ def clear_failed_login(identifier: str):
     """
     if identifier in failed_login_attempts:
         del failed_login_attempts[identifier]
+    _unlocked_attempts.pop(identifier, None)
+
+
+def clear_login_attempts():
+    """Forget all failed-login state (lockouts, expiry heap, cleanup throttle)"""
+    global _last_cleanup_ns
+    failed_login_attempts.clear()
+    _expiry_heap.clear()
+    _unlocked_attempts.clear()
+    _last_cleanup_ns = 0
 
 
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
     response: Response,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Login and get JWT access token
@@ -122,7 +185,7 @@ async def login_for_access_token(
         )
 
     try:
-        user = authenticate_user(db, username, form_data.password)
+        user = await authenticate_user(db, username, form_data.password)
     except SQLAlchemyError:
         # Log error internally
         raise HTTPException(
@@ -149,10 +212,9 @@ async def login_for_access_token(
     # This prevents attackers from resetting the counter by using a valid credential
     # The counter is automatically cleared when the lockout period expires
 
-    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": str(user.id), "token_version": user.token_version},
-        expires_delta=access_token_expires
+        data={"sub": str(user.id), "token_version": user.token_version, "act": user.is_active},
+        expires_delta=ACCESS_TOKEN_EXPIRES
     )
 
     # Set token as HttpOnly cookie to prevent XSS attacks
@@ -162,22 +224,38 @@ async def login_for_access_token(
         httponly=True,
         secure=False,  # Set to True in production with HTTPS
         samesite="lax",
-        max_age=settings.access_token_expire_minutes * 60
+        max_age=ACCESS_TOKEN_MAX_AGE_SECONDS
     )
 
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.post("/logout")
-async def logout(response: Response):
+async def logout(
+    response: Response,
+    token: Optional[str] = Depends(oauth2_scheme),
+    access_token: Optional[str] = Cookie(default=None)
+):
     """
     Logout and clear authentication cookie
 
-    Clears the HttpOnly cookie containing the JWT token.
+    Clears the HttpOnly cookie containing the JWT token and adds the
+    presented token to this worker process's blocklist. This is best-effort,
+    not revocation: other workers and instances keep accepting the token
+    until it expires, and the blocklist drops its oldest entries once it is
+    full. Bump the user's token_version to invalidate tokens everywhere.
+
+    Args:
+        response: FastAPI response object for clearing cookies
+        token: Token from Authorization header (optional)
+        access_token: Token from HttpOnly cookie (optional)
 
     Returns:
         Success message
     """
+    for presented_token in (access_token, token):
+        if presented_token:
+            revoke_token(presented_token)
     response.delete_cookie(key="access_token")
     return {"message": "Successfully logged out"}
 
@@ -185,7 +263,7 @@ async def logout(response: Response):
 @router.post("/register", response_model=UserResponse)
 async def register_user(
     user_create: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Register a new user
@@ -203,26 +281,32 @@ async def register_user(
     Raises:
         HTTPException: If username or email already exists
     """
-    # Check if username already exists
-    db_user = db.query(User).filter(User.username == user_create.username).first()
-    if db_user:
+    # Check username and email (normalized to lowercase) in a single round-trip;
+    # the IntegrityError handler below stays authoritative for races
+    conflict = (await db.execute(
+        select(User.username, User.email).where(
+            or_(
+                User.username == user_create.username,
+                User.email == user_create.email,
+            )
+        )
+        # A username clash takes precedence when both columns conflict
+        .order_by((User.username == user_create.username).desc())
+    )).first()
+    if conflict and conflict.username == user_create.username:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
-
-    # Check if email already exists (case-insensitive for better UX)
-    db_user = db.query(User).filter(
-        User.email.ilike(user_create.email)
-    ).first()
-    if db_user:
+    if conflict:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
 
     # Create new user with hashed password
-    hashed_password = get_password_hash(user_create.password)
+    # argon2 is CPU-bound and releases the GIL; keep it off the event loop
+    hashed_password = await run_in_threadpool(get_password_hash, user_create.password)
     db_user = User(
         username=user_create.username,
         email=user_create.email,
@@ -232,10 +316,10 @@ async def register_user(
     # Handle race condition with try-except for IntegrityError
     try:
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         error_msg = str(e.orig) if hasattr(e, 'orig') else str(e)
         if 'username' in error_msg.lower():
             raise HTTPException(
@@ -253,19 +337,19 @@ async def register_user(
                 detail="Registration failed due to constraint violation"
             )
     except DataError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Data validation failed: Value too long or invalid format"
         )
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Database error occurred"
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An unexpected error occurred"
@@ -276,27 +360,59 @@ async def register_user(
 
 @router.get("/users/me", response_model=UserResponse)
 async def read_users_me(
-    current_user: User = Depends(get_current_active_user)
+    request: Request,
+    token_data: TokenData = Depends(get_current_user_light),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get current user information
 
     Returns the profile information of the currently authenticated user.
+    Responses carry a weak ETag and a short private max-age; a matching
+    If-None-Match gets a 304. The ETag and serialized body are memoized
+    briefly per (user id, token_version), so a warm request is answered
+    from the token claims alone without loading the user.
 
     Args:
-        current_user: Current authenticated user from JWT token
+        request: FastAPI request object (for If-None-Match)
+        token_data: Claims of the current JWT token
+        db: Database session (only used on a cache miss)
 
     Returns:
         UserResponse object with user details
     """
-    return current_user
+    if not token_data.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+
+    cache_key = (token_data.user_id, token_data.token_version)
+    cached = user_response_cache.get(cache_key)
+    if cached is None:
+        current_user = await get_user_for_token(db, token_data)
+        if not current_user.is_active:
+            raise HTTPException(status_code=400, detail="Inactive user")
+        last_modified = current_user.updated_at or current_user.created_at
+        etag = (
+            f'W/"{current_user.id}:{current_user.token_version}:'
+            f'{int(last_modified.timestamp() * 1_000_000)}"'
+        )
+        body = UserResponse.model_validate(current_user).model_dump_json()
+        cached = user_response_cache[cache_key] = (etag, body)
+
+    etag, body = cached
+    headers = {"ETag": etag, "Cache-Control": USERS_ME_CACHE_CONTROL}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.put("/users/me", response_model=UserResponse)
 async def update_user_me(
     user_update: UserUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update current user information
@@ -317,41 +433,61 @@ async def update_user_me(
         HTTPException: If new username or email already exists
     """
     # Update username if provided and different
+    new_username = None
     if user_update.username and user_update.username != current_user.username:
-        # Check if new username already exists
-        db_user = db.query(User).filter(User.username == user_update.username).first()
+        new_username = user_update.username
+
+    # Update email if provided and different (emails are normalized to lowercase)
+    new_email = None
+    if user_update.email and user_update.email != current_user.email.lower():
+        new_email = user_update.email
+
+    # Run every uniqueness check before touching the user, so a rejected
+    # update leaves nothing half-applied in the session
+    if new_username:
+        db_user = (await db.execute(
+            select(User.id).where(User.username == new_username)
+        )).scalar_one_or_none()
         if db_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Username already registered"
             )
-        current_user.username = user_update.username
-
-    # Update email if provided and different (case-insensitive comparison)
-    if user_update.email and user_update.email.lower() != current_user.email.lower():
-        db_user = db.query(User).filter(User.email.ilike(user_update.email)).first()
+    if new_email:
+        db_user = (await db.execute(
+            select(User.id).where(User.email == new_email)
+        )).scalar_one_or_none()
         if db_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered"
             )
-        current_user.email = user_update.email
 
-    # Commit with error handling
+    # Captured up front: a rollback expires the instance's attributes
+    user_id = current_user.id
+    token_version = current_user.token_version
     try:
-        db.commit()
-        db.refresh(current_user)
+        if new_username:
+            current_user.username = new_username
+        if new_email:
+            current_user.email = new_email
+        await db.commit()
+        await db.refresh(current_user)
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Update failed due to constraint violation"
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to update user"
         )
+    finally:
+        # Cached copies are dropped whether or not the update went through
+        invalidate_cached_user(user_id)
+        user_response_cache.pop((user_id, token_version), None)
     
     return current_user
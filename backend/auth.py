@@ -1,24 +1,69 @@
 """
 SVV-LoginPage Authentication Module
-JWT-based authentication with bcrypt password hashing
+JWT-based authentication with argon2id password hashing
 """
 
-from datetime import datetime, timedelta, timezone
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+from datetime import timedelta
 from typing import Optional
 
+import bcrypt as _bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, status, Request, Cookie
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+import jwt
+import orjson
+from jwt.exceptions import ExpiredSignatureError, PyJWTError as JWTError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
 from backend.config import settings
 from backend.database import get_db
 from backend.models import User
 from backend.schemas import TokenData
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hot settings bound once at import (Settings stays the source of truth)
+_SECRET_KEY = settings.secret_key_bytes
+_ALGORITHM = settings.algorithm
+_TOKEN_TTL = timedelta(minutes=settings.access_token_expire_minutes)
+_TOKEN_TTL_SECONDS = settings.access_token_expire_minutes * 60
+_LOGIN_CACHE_ENABLED = settings.login_cache_enabled
+
+# HS256 tokens are signed without PyJWT: the header is constant, so it is
+# encoded once and only the payload is serialized per token
+_HS256_HEADER_B64 = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b"=")
+# Keyed HMAC-SHA256 state; copying it per token skips re-deriving the key pads
+_HS256_MAC = hmac.new(_SECRET_KEY, None, hashlib.sha256)
+
+# Password hasher, built once and reused for every request
+# argon2id is the only scheme for new hashes; legacy bcrypt hashes still verify
+# and are upgraded to argon2id on the user's next successful login
+_argon2_hasher = PasswordHasher(
+    time_cost=settings.argon2_time_cost,
+    memory_cost=settings.argon2_memory_cost_kib,
+    parallelism=settings.argon2_parallelism,
+)
+
+# Process-local caches for the authenticated request path
+# Decoded JWT payloads keyed by token digest (a payload never changes before expiry)
+_payload_cache: TTLCache = TTLCache(maxsize=10000, ttl=30)
+# User objects keyed by id, merged into the request session without a SELECT
+_user_cache: TTLCache = TTLCache(maxsize=5000, ttl=60)
+# Digests of tokens logged out on this worker, remembered until the token would
+# expire. Per process and LRU-bounded: a best-effort blocklist, not revocation
+_revoked_tokens: TTLCache = TTLCache(maxsize=10000, ttl=_TOKEN_TTL_SECONDS)
+# Opt-in: HMAC(username, password) -> hashed_password that it verified against.
+# The pepper is random per process and never persisted or logged.
+_login_cache: TTLCache = TTLCache(maxsize=5000, ttl=60)
+_LOGIN_CACHE_PEPPER = secrets.token_bytes(32)
 
 # OAuth2 authentication scheme (optional - also support cookie-based auth)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/token", auto_error=False)
@@ -57,21 +102,72 @@ def get_token_from_cookie_or_header(
     )
 
 
+def _token_cache_key(token: str) -> bytes:
+    """Short digest of a JWT used as the cache/blocklist key"""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+def revoke_token(token: str) -> None:
+    """Reject a token in this worker process for the rest of its lifetime
+
+    Used on logout. The blocklist is process-local and bounded, so this is
+    best-effort: see the logout endpoint for its limits.
+    """
+    key = _token_cache_key(token)
+    _revoked_tokens[key] = True
+    _payload_cache.pop(key, None)
+
+
+def invalidate_cached_user(user_id: int) -> None:
+    """Drop a user from the cache after their row has been modified"""
+    _user_cache.pop(user_id, None)
+
+
+def clear_auth_caches() -> None:
+    """Empty all process-local authentication caches"""
+    _payload_cache.clear()
+    _user_cache.clear()
+    _revoked_tokens.clear()
+    _login_cache.clear()
+
+
+def _login_cache_key(username: str, password: str) -> bytes:
+    return hmac.new(_LOGIN_CACHE_PEPPER, f"{username}\0{password}".encode(), hashlib.sha256).digest()
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a plain password against a hashed password"""
-    return pwd_context.verify(plain_password, hashed_password)
+    """Verify a plain password against a hashed password
+
+    argon2id hashes are checked with argon2-cffi; legacy bcrypt hashes
+    are still accepted via bcrypt.checkpw.
+    """
+    try:
+        if hashed_password.startswith("$argon2"):
+            return _argon2_hasher.verify(hashed_password, plain_password)
+        return _bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
+    except (VerificationError, InvalidHashError, ValueError):
+        return False
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Check whether a verified hash should be upgraded to the current scheme/cost"""
+    if hashed_password.startswith("$argon2"):
+        return _argon2_hasher.check_needs_rehash(hashed_password)
+    # Any other scheme is deprecated
+    return True
 
 
 def get_password_hash(password: str) -> str:
-    """Generate bcrypt hash for a password"""
-    return pwd_context.hash(password)
+    """Generate argon2id hash for a password"""
+    return _argon2_hasher.hash(password)
 
 
-# Dummy hash for timing attack prevention (pre-computed bcrypt hash)
-DUMMY_HASH = "$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN8/X4.VTtYA1S1qKhWdW"
+# Dummy hash for timing attack prevention
+# Computed with the active scheme so the no-user path costs the same as a real verify
+DUMMY_HASH = _argon2_hasher.hash("dummy-password")
 
 
-def authenticate_user(db: Session, username: str, password: str):
+async def authenticate_user(db: AsyncSession, username: str, password: str):
     """Authenticate a user with username and password
 
     Args:
@@ -82,18 +178,46 @@ def authenticate_user(db: Session, username: str, password: str):
     Returns:
         User object if authentication succeeds, False otherwise
     """
-    user = db.query(User).filter(User.username == username).first()
+    result = await db.execute(select(User).where(User.username == username))
+    user = result.scalar_one_or_none()
+
+    # Opt-in login cache: a pair verified within the last minute against the
+    # user's current hash skips the password hash entirely
+    login_cache_key = None
+    if _LOGIN_CACHE_ENABLED and user is not None:
+        login_cache_key = _login_cache_key(username, password)
+        if _login_cache.get(login_cache_key) == user.hashed_password:
+            return user
 
     # Always perform password verification to prevent timing attacks
     # Use dummy hash when user doesn't exist to maintain consistent response time
     hash_to_verify = user.hashed_password if user else DUMMY_HASH
-    password_valid = verify_password(password, hash_to_verify)
+    # argon2 is CPU-bound and releases the GIL; keep it off the event loop
+    password_valid = await run_in_threadpool(verify_password, password, hash_to_verify)
 
     if not user or not password_valid:
         return False
+
+    # Upgrade legacy (bcrypt) or outdated-cost hashes now that we have the plaintext
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await run_in_threadpool(get_password_hash, password)
+        await db.commit()
+
+    if login_cache_key is not None:
+        _login_cache[login_cache_key] = user.hashed_password
     return user
 
 
+def _encode_hs256(payload: dict) -> str:
+    """Encode and sign a JWT with the precomputed HS256 header"""
+    payload_b64 = base64.urlsafe_b64encode(orjson.dumps(payload)).rstrip(b"=")
+    signing_input = _HS256_HEADER_B64 + b"." + payload_b64
+    mac = _HS256_MAC.copy()
+    mac.update(signing_input)
+    signature = mac.digest()
+    return (signing_input + b"." + base64.urlsafe_b64encode(signature).rstrip(b"=")).decode("ascii")
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token
 
@@ -105,16 +229,124 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         Encoded JWT token string
     """
     to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
+    if not expires_delta:
+        expires_delta = _TOKEN_TTL
+    # JWT exp is seconds since epoch; an int avoids building tz-aware datetimes
+    to_encode["exp"] = int(time.time()) + int(expires_delta.total_seconds())
+    if _ALGORITHM == "HS256":
+        return _encode_hs256(to_encode)
+    return jwt.encode(to_encode, _SECRET_KEY, algorithm=_ALGORITHM)
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def get_current_user_light(token: str = Depends(get_token_from_cookie_or_header)) -> TokenData:
+    """Get token claims for the current request without touching the database
+
+    Validates the JWT (signature, expiry, revocation) and returns its claims.
+    Decoded payloads are served from a short-lived process-local cache, so a
+    warm request skips the signature check entirely.
+
+    Args:
+        token: JWT token from cookie or Authorization header
+
+    Returns:
+        TokenData with user_id, token_version and is_active claims
+
+    Raises:
+        HTTPException: If token is missing, invalid, expired or revoked
+    """
+    if not token:
+        raise _credentials_exception()
+
+    key = _token_cache_key(token)
+    if key in _revoked_tokens:
+        raise _credentials_exception()
+
+    payload = _payload_cache.get(key)
+    # Cached payloads are only reused while the token itself is unexpired
+    if payload is None or payload["exp"] <= time.time():
+        try:
+            payload = jwt.decode(
+                token,
+                _SECRET_KEY,
+                algorithms=[_ALGORITHM],
+                options={"require": ["exp", "sub"]},
+            )
+        except ExpiredSignatureError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has expired",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        except JWTError:
+            raise _credentials_exception()
+        _payload_cache[key] = payload
+
+    try:
+        user_id = int(payload["sub"])
+    except ValueError:
+        raise _credentials_exception()
+    return TokenData(
+        user_id=user_id,
+        token_version=payload.get("token_version", 0),
+        is_active=payload.get("act", True),
+    )
+
+
+def _detached_snapshot(user: User) -> User:
+    """Copy a loaded user into a clean, detached instance
+
+    The cache must never hold a session's own instance: a request that
+    modifies it without committing would leave it dirty for every later
+    merge(load=False).
+    """
+    snapshot = User(**{attr.key: getattr(user, attr.key) for attr in User.__mapper__.column_attrs})
+    make_transient_to_detached(snapshot)
+    return snapshot
+
+
+async def get_user_for_token(db: AsyncSession, token_data: TokenData) -> User:
+    """Load the user a validated token belongs to
+
+    Users are served from a short-lived process-local cache of detached
+    snapshots, merged into the request session, so a warm request issues
+    no SELECT.
+
+    Args:
+        db: Database session
+        token_data: Claims from get_current_user_light
+
+    Returns:
+        User object
+
+    Raises:
+        HTTPException: If user not found or token_version mismatch
+    """
+    cached_user = _user_cache.get(token_data.user_id)
+    if cached_user is not None:
+        user = await db.merge(cached_user, load=False)
     else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=settings.access_token_expire_minutes)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
-    return encoded_jwt
+        result = await db.execute(select(User).where(User.id == token_data.user_id))
+        user = result.scalar_one_or_none()
+        if user is None:
+            raise _credentials_exception()
+        _user_cache[token_data.user_id] = _detached_snapshot(user)
 
+    # Validate token_version to invalidate tokens after password change
+    if user.token_version != token_data.token_version:
+        raise _credentials_exception()
 
-async def get_current_user(token: str = Depends(get_token_from_cookie_or_header), db: Session = Depends(get_db)) -> User:
+    return user
+
+
+async def get_current_user(token: str = Depends(get_token_from_cookie_or_header), db: AsyncSession = Depends(get_db)) -> User:
     """Get current user from JWT token
 
     Dependency function that extracts and validates JWT token,
@@ -131,29 +363,8 @@ async def get_current_user(token: str = Depends(get_token_from_cookie_or_header)
     Raises:
         HTTPException: If token is invalid, user not found, or token_version mismatch
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-        token_version: int = payload.get("token_version", 0)
-    except JWTError:
-        raise credentials_exception
-
-    user = db.query(User).filter(User.id == int(user_id)).first()
-    if user is None:
-        raise credentials_exception
-
-    # Validate token_version to invalidate tokens after password change
-    if user.token_version != token_version:
-        raise credentials_exception
-
-    return user
+    token_data = await get_current_user_light(token)
+    return await get_user_for_token(db, token_data)
 
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
@@ -176,7 +387,7 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
 
 
 async def get_current_user_optional(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
 ) -> Optional[User]:
     """Get current user, returns None if authentication fails
 
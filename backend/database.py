@@ -3,70 +3,101 @@ SVV-LoginPage Database Connection
 SQLAlchemy database engine and session management
 """
 
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 
 from backend.config import settings
 
+# Async drivers for plain or sync-driver database URLs (e.g. from an older
+# .env or deploy config); create_async_engine rejects sync drivers
+_ASYNC_DRIVERS = {
+    "postgresql://": "postgresql+asyncpg://",
+    "postgres://": "postgresql+asyncpg://",
+    "postgresql+psycopg2://": "postgresql+asyncpg://",
+    "postgresql+pg8000://": "postgresql+asyncpg://",
+    "sqlite://": "sqlite+aiosqlite://",
+}
+
+
+def get_async_database_url(url: str) -> str:
+    """Rewrite a database URL to use its asyncio driver"""
+    for prefix, async_prefix in _ASYNC_DRIVERS.items():
+        if url.startswith(prefix):
+            return async_prefix + url[len(prefix):]
+    return url
+
+
+DATABASE_URL = get_async_database_url(settings.database_url)
+
 # Create database engine
 # Handle SQLite vs PostgreSQL differences
-if settings.database_url.startswith("sqlite"):
+if DATABASE_URL.startswith("sqlite"):
     # SQLite configuration
-    engine = create_engine(
-        settings.database_url,
+    engine = create_async_engine(
+        DATABASE_URL,
         echo=settings.debug,
-        connect_args={"check_same_thread": False}
+        query_cache_size=settings.db_query_cache_size
     )
 else:
     # PostgreSQL configuration
-    engine = create_engine(
-        settings.database_url,
+    engine = create_async_engine(
+        DATABASE_URL,
         echo=settings.debug,
-        pool_pre_ping=True,
-        pool_recycle=300
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_recycle=settings.db_pool_recycle,
+        query_cache_size=settings.db_query_cache_size
     )
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Objects stay loaded after commit: lazy loads are not possible on an AsyncSession
+SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
 
 # Create base class for declarative models
 Base = declarative_base()
 
 
-def get_db():
+async def get_db():
     """Dependency function to get database session
 
     Usage in FastAPI endpoints:
         @app.get("/users")
-        def get_users(db: Session = Depends(get_db)):
-            return db.query(User).all()
+        async def get_users(db: AsyncSession = Depends(get_db)):
+            return (await db.execute(select(User))).scalars().all()
 
     Yields:
-        SQLAlchemy Session object
+        SQLAlchemy AsyncSession object
 
     Ensures:
         Database session is properly closed after request
     """
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-def init_db():
+async def init_db():
     """Initialize database tables
 
     Creates all tables defined in models.py.
     Should be called once during application startup.
 
     Example:
+        import asyncio
         from backend.database import init_db
-        init_db()
+        asyncio.run(init_db())
     """
-    # Import models to ensure they are registered with Base
-    from backend.models import User
-
     # Create all tables
-    Base.metadata.create_all(bind=engine)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    finally:
+        # Pooled connections are bound to this event loop; callers usually
+        # run init_db under asyncio.run() and then serve from another loop
+        await engine.dispose()
+
+
+# Register the models with Base as soon as the engine module is loaded
+# (models.py imports Base from here, so this must come after it)
+from backend import models as _models  # noqa: E402,F401
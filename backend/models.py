@@ -4,7 +4,7 @@ SQLAlchemy ORM models for user authentication
 """
 
 from datetime import datetime
-from sqlalchemy import Boolean, Column, DateTime, Integer, String
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, String
 from sqlalchemy.sql import func
 
 from backend.database import Base
@@ -17,7 +17,7 @@ class User(Base):
         id: Primary key
         username: Unique username for login (max 100 chars)
         email: Unique email address (max 255 chars)
-        hashed_password: Bcrypt hashed password
+        hashed_password: Argon2id (or legacy bcrypt) hashed password
         is_active: Whether the user account is active
         is_superuser: Whether the user has superuser privileges
         created_at: Timestamp of account creation
@@ -26,9 +26,9 @@ class User(Base):
     """
     __tablename__ = "users"
 
-    id = Column(Integer, primary_key=True, index=True)
-    username = Column(String(100), unique=True, nullable=False, index=True)
-    email = Column(String(255), unique=True, nullable=False, index=True)
+    id = Column(Integer, primary_key=True)
+    username = Column(String(100), unique=True, nullable=False)
+    email = Column(String(255), unique=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
     is_active = Column(Boolean, default=True)
     is_superuser = Column(Boolean, default=False)
@@ -36,5 +36,12 @@ class User(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     token_version = Column(Integer, default=0, nullable=False)
 
+    __table_args__ = (
+        # Emails are stored lowercase; this also rejects legacy case-variant duplicates
+        Index("users_email_lower_idx", func.lower(email), unique=True),
+        # Lets token_version checks by id run as an index-only scan
+        Index("ix_users_token_ver", "id", "token_version"),
+    )
+
     def __repr__(self):
         return f"<User(id={self.id}, username='{self.username}')>"
@@ -3,57 +3,68 @@ SVV-LoginPage Pydantic Schemas
 Data validation and serialization schemas for API requests/responses
 """
 
+import functools
 import re
+import string
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel, EmailStr, field_validator
+from typing import Annotated, Optional
+from pydantic import BaseModel, StringConstraints, field_validator
 
 
-# Validation patterns
-USERNAME_PATTERN = re.compile(r'^[a-zA-Z0-9_]+$')
-# Password allowed characters: letters, digits, and special characters !@#$%^&*
-PASSWORD_ALLOWED_PATTERN = re.compile(r'^[a-zA-Z0-9!@#$%^&*]+$')
-PASSWORD_UPPERCASE = re.compile(r'[A-Z]')
-PASSWORD_LOWERCASE = re.compile(r'[a-z]')
-PASSWORD_DIGIT = re.compile(r'[0-9]')
-PASSWORD_SPECIAL = re.compile(r'[!@#$%^&*]')
+@functools.cache
+def _rx(pattern: str, flags: int = 0) -> re.Pattern:
+    """Compile a regex once per process; other modules should reuse this"""
+    return re.compile(pattern, flags)
 
 
-def validate_username(username: str) -> str:
-    """Validate username contains only letters, numbers, and underscores"""
-    if not USERNAME_PATTERN.match(username):
-        raise ValueError('Username can only contain letters (a-z, A-Z), numbers (0-9), and underscores (_)')
-    if len(username) < 3:
-        raise ValueError('Username must be at least 3 characters')
-    if len(username) > 100:
-        raise ValueError('Username must be at most 100 characters')
-    return username
+# Validation patterns
+USERNAME_PATTERN = _rx(r'^[a-zA-Z0-9_]+$')
+# Pragmatic RFC 5321 subset: local@domain.tld (no quoted local parts or IP literals)
+EMAIL_PATTERN = _rx(r'^[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}$')
+# Password allowed characters: letters, digits, and special characters !@#$%^&*
+PASSWORD_ALLOWED_PATTERN = _rx(r'^[a-zA-Z0-9!@#$%^&*]+$')
+
+# Password character classes, checked with set intersections on the
+# password's distinct characters
+_PW_UPPER = frozenset(string.ascii_uppercase)
+_PW_LOWER = frozenset(string.ascii_lowercase)
+_PW_DIGIT = frozenset(string.digits)
+_PW_SPECIAL = frozenset('!@#$%^&*')
+_PW_ALLOWED = frozenset(map(chr, range(32, 127)))  # Printable ASCII
+_PW_CLASS_ERRORS = (
+    (_PW_UPPER, 'contain at least one uppercase letter'),
+    (_PW_LOWER, 'contain at least one lowercase letter'),
+    (_PW_DIGIT, 'contain at least one digit'),
+    (_PW_SPECIAL, 'contain at least one special character (!@#$%^&*)'),
+)
+_PW_INVALID_MESSAGE = 'Password contains invalid characters. Only printable ASCII characters are allowed.'
+
+# Shared constrained types (checked natively by pydantic-core); defined once so
+# every schema reuses the same core schema instead of building its own copy
+Username = Annotated[str, StringConstraints(min_length=3, max_length=100, pattern=USERNAME_PATTERN.pattern)]
+Password = Annotated[str, StringConstraints(min_length=8, max_length=128)]
+# Lowercased on input so uniqueness checks can use plain equality
+Email = Annotated[str, StringConstraints(max_length=255, pattern=EMAIL_PATTERN.pattern, to_lower=True)]
 
 
 def validate_password(password: str) -> str:
-    """Validate password contains uppercase, lowercase, digit, and special character"""
+    """Validate password contains uppercase, lowercase, digit, and special character
+
+    Length bounds (8-128) are enforced by the field's StringConstraints
+    before this runs.
+    """
     # Collect all validation errors
     errors = []
-    
-    # Check length constraints
-    password_length = len(password)
-    if password_length < 8:
-        errors.append('be at least 8 characters long')
-    if password_length > 128:
-        errors.append('be at most 128 characters')
-    
+
+    chars = frozenset(password)
+
     # Only allow printable ASCII characters
-    if any(ord(c) < 32 or ord(c) > 126 for c in password):
-        raise ValueError('Password contains invalid characters. Only printable ASCII characters are allowed.')
-    
-    if not PASSWORD_UPPERCASE.search(password):
-        errors.append('contain at least one uppercase letter')
-    if not PASSWORD_LOWERCASE.search(password):
-        errors.append('contain at least one lowercase letter')
-    if not PASSWORD_DIGIT.search(password):
-        errors.append('contain at least one digit')
-    if not PASSWORD_SPECIAL.search(password):
-        errors.append('contain at least one special character (!@#$%^&*)')
+    if not chars <= _PW_ALLOWED:
+        raise ValueError(_PW_INVALID_MESSAGE)
+
+    for char_class, message in _PW_CLASS_ERRORS:
+        if chars.isdisjoint(char_class):
+            errors.append(message)
     
     if errors:
         raise ValueError('Password MUST: ' + '; '.join(errors))
@@ -63,20 +74,8 @@ def validate_password(password: str) -> str:
 # User Schemas
 class UserBase(BaseModel):
     """Base user schema with common fields"""
-    username: str
-    email: EmailStr
-
-    @field_validator('username')
-    @classmethod
-    def username_valid(cls, v: str) -> str:
-        return validate_username(v)
-
-    @field_validator('email')
-    @classmethod
-    def email_length_valid(cls, v: str) -> str:
-        if len(v) > 255:
-            raise ValueError('Email must be at most 255 characters')
-        return v
+    username: Username
+    email: Email
 
 
 class UserCreate(UserBase):
@@ -87,7 +86,7 @@ class UserCreate(UserBase):
         email: Unique email address (inherited)
         password: Plain text password (will be hashed)
     """
-    password: str
+    password: Password
 
     @field_validator('password')
     @classmethod
@@ -105,22 +104,8 @@ class UserUpdate(BaseModel):
         username: New username (must be unique if provided)
         email: New email address (must be unique if provided)
     """
-    username: Optional[str] = None
-    email: Optional[EmailStr] = None
-
-    @field_validator('username')
-    @classmethod
-    def username_valid(cls, v: Optional[str]) -> Optional[str]:
-        if v is not None:
-            return validate_username(v)
-        return v
-
-    @field_validator('email')
-    @classmethod
-    def email_length_valid(cls, v: Optional[str]) -> Optional[str]:
-        if v is not None and len(v) > 255:
-            raise ValueError('Email must be at most 255 characters')
-        return v
+    username: Optional[Username] = None
+    email: Optional[Email] = None
 
 
 class UserResponse(UserBase):
@@ -129,11 +114,14 @@ class UserResponse(UserBase):
     Attributes:
         id: User ID
         username: Username (inherited)
-        email: Email address (inherited)
+        email: Email address as stored
         is_active: Whether the user account is active
         is_superuser: Whether the user has superuser privileges
         created_at: Timestamp of account creation
     """
+    # Output is not re-validated against the input pattern: rows accepted by
+    # older rules (e.g. internationalized domains) must still serialize
+    email: str
     id: int
     is_active: bool
     is_superuser: bool
@@ -160,5 +148,11 @@ class TokenData(BaseModel):
 
     Attributes:
         username: Username extracted from JWT token
+        user_id: User ID from the "sub" claim
+        token_version: Token version from the "token_version" claim
+        is_active: Account status at issue time from the "act" claim
     """
     username: Optional[str] = None
+    user_id: Optional[int] = None
+    token_version: int = 0
+    is_active: bool = True
@@ -12,12 +12,15 @@ Then visit:
     - Login: POST http://localhost:8000/api/auth/token
 """
 
+import asyncio
 import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from starlette.exceptions import HTTPException
+from starlette.responses import Response
 from backend import router
+from backend.config import settings
 from backend.database import init_db
 
 # Create FastAPI app
@@ -34,8 +37,8 @@ cors_origins = [
     "http://localhost:3000",
 ]
 # Add Cloud Run URL if set
-if os.environ.get("CLOUD_RUN_URL"):
-    cors_origins.append(os.environ.get("CLOUD_RUN_URL"))
+if settings.cloud_run_url:
+    cors_origins.append(settings.cloud_run_url)
 
 app.add_middleware(
     CORSMiddleware,
@@ -48,29 +51,38 @@ app.add_middleware(
 # Include authentication routes
 app.include_router(router)
 
+
+# Health check endpoint
+@app.get("/health")
+async def health_check():
+    return {"status": "healthy"}
+
+
 # Serve static files (frontend build)
 STATIC_DIR = "static"
-if os.path.exists(STATIC_DIR):
-    app.mount("/assets", StaticFiles(directory=f"{STATIC_DIR}/assets"), name="assets")
+# First path segments that belong to the API/docs, never to the SPA
+RESERVED_PREFIXES = frozenset({"api", "docs", "health", "openapi.json"})
 
-    # Serve index.html for root and all non-API routes (SPA fallback)
-    @app.get("/")
-    async def serve_frontend():
-        return FileResponse(f"{STATIC_DIR}/index.html")
-
-    @app.get("/{full_path:path}")
-    async def serve_spa(full_path: str):
-        # Don't intercept API routes
-        if full_path.startswith("api/") or full_path.startswith("docs") or full_path.startswith("health"):
-            return {"error": "Not found"}
-
-        # Check if file exists in static directory
-        file_path = f"{STATIC_DIR}/{full_path}"
-        if os.path.exists(file_path) and os.path.isfile(file_path):
-            return FileResponse(file_path)
-
-        # Otherwise, serve index.html (SPA fallback)
-        return FileResponse(f"{STATIC_DIR}/index.html")
+
+class SPAStaticFiles(StaticFiles):
+    """StaticFiles that serves index.html for unknown non-API paths
+
+    Starlette's html=True only resolves directory index files, so client-side
+    routes (e.g. /dashboard) need this fallback to reach the SPA.
+    """
+
+    async def get_response(self, path: str, scope) -> Response:
+        try:
+            return await super().get_response(path, scope)
+        except HTTPException as exc:
+            if exc.status_code != 404 or path.partition("/")[0] in RESERVED_PREFIXES:
+                raise
+            return await super().get_response("index.html", scope)
+
+
+if os.path.exists(STATIC_DIR):
+    # Mounted last so API, docs and health routes take precedence
+    app.mount("/", SPAStaticFiles(directory=STATIC_DIR, html=True), name="spa")
 else:
     # Fallback if static directory doesn't exist
     @app.get("/")
@@ -86,12 +98,6 @@ else:
             }
         }
 
-# Health check endpoint
-@app.get("/health")
-async def health_check():
-    return {"status": "healthy"}
-
-
 if __name__ == "__main__":
     import uvicorn
 
@@ -102,7 +108,7 @@ if __name__ == "__main__":
 
     # Initialize database (create tables)
     try:
-        init_db()
+        asyncio.run(init_db())
         print("✓ Database initialized successfully!")
     except Exception as e:
         print(f"✗ Database initialization failed: {e}")
@@ -119,7 +125,7 @@ if __name__ == "__main__":
 
     # Run the application
     # Cloud Run sets PORT env var
-    port = int(os.environ.get("PORT", 8000))
+    port = settings.port or settings.app_port
     uvicorn.run(
         app,
         host="0.0.0.0",
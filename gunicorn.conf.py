@@ -6,14 +6,24 @@ import os
 bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
 
 # Worker processes
-# Recommended formula: 2 * CPU cores + 1
+# Recommended formula: 2 * CPU cores + 1, capped at 8
+# Each worker opens its own database pool of up to DB_POOL_SIZE + DB_MAX_OVERFLOW
+# connections (20 + 40 by default), so size those for the worker count:
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) must stay below PostgreSQL's
+# max_connections (100 by default)
 # Can be overridden with GUNICORN_WORKERS env var
 _workers_env = os.environ.get("GUNICORN_WORKERS", "")
-workers = int(_workers_env) if _workers_env else multiprocessing.cpu_count() * 2 + 1
+workers = int(_workers_env) if _workers_env else min(multiprocessing.cpu_count() * 2 + 1, 8)
 
 # Use uvicorn workers for async support
 worker_class = "uvicorn.workers.UvicornWorker"
 
+# UvicornWorker runs a single event loop; extra threads only add overhead
+threads = 1
+
+# Worker heartbeat files on tmpfs instead of the (possibly overlayfs) disk
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
 # Worker timeout (seconds)
 timeout = 120
 
@@ -35,5 +45,5 @@ preload_app = True
 graceful_timeout = 30
 
 # Max requests per worker before restart (prevents memory leaks)
-max_requests = 1000
+max_requests = 10000
 max_requests_jitter = 50
@@ -23,9 +23,40 @@ BEGIN
     END IF;
 END $$;
 
--- Create indexes for better query performance
-CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
-CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
+-- Indexes
+-- username and email are already indexed by their UNIQUE constraints;
+-- drop the duplicate plain indexes created by earlier versions of this script
+DROP INDEX IF EXISTS idx_users_username;
+DROP INDEX IF EXISTS idx_users_email;
+-- ...and the ones created by Base.metadata.create_all from index=True
+DROP INDEX IF EXISTS ix_users_username;
+DROP INDEX IF EXISTS ix_users_email;
+-- The primary key is already indexed; drop the duplicate from index=True on users.id
+DROP INDEX IF EXISTS ix_users_id;
+
+-- Logins match usernames exactly (served by the UNIQUE index), so the
+-- lower(username) index added by an earlier version of this script is unused
+DROP INDEX IF EXISTS ix_users_username_lower;
+
+-- Covers token_version revocation checks by id as an index-only scan
+CREATE INDEX IF NOT EXISTS ix_users_token_ver ON users (id, token_version);
+
+-- Migration: Normalize emails to lowercase (the API stores them lowercase)
+-- Rows whose emails differ only by case make both the UPDATE and the unique
+-- index below fail. List them, then merge or rename the duplicates by hand:
+--   SELECT lower(email) AS email, array_agg(id ORDER BY id) AS user_ids
+--   FROM users GROUP BY lower(email) HAVING count(*) > 1;
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM users GROUP BY lower(email) HAVING count(*) > 1) THEN
+        RAISE EXCEPTION 'users has emails that differ only by case; merge them before migrating (see the query above)';
+    END IF;
+END $$;
+UPDATE users SET email = lower(email) WHERE email <> lower(email);
+
+-- Case-insensitive email uniqueness
+DROP INDEX IF EXISTS ix_users_email_lower;
+CREATE UNIQUE INDEX IF NOT EXISTS users_email_lower_idx ON users (lower(email));
 
 -- Create trigger to automatically update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
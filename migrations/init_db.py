@@ -8,6 +8,7 @@ Usage:
     python init_db.py --create-admin     # Create tables and admin user
 """
 
+import asyncio
 import sys
 import os
 from pathlib import Path
@@ -15,67 +16,72 @@ from pathlib import Path
 # Add parent directory to path to import backend module
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from backend.database import engine, Base, SessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from backend.database import engine, Base
 from backend.models import User
 from backend.auth import get_password_hash
 
 
-def init_database():
+async def init_database(conn: AsyncConnection):
     """Initialize database by creating all tables"""
     print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
+    await conn.run_sync(Base.metadata.create_all)
     print("✓ Database tables created successfully!")
 
 
-def create_admin_user(username="admin", email="admin@example.com", password="admin123"):
+async def create_admin_user(conn: AsyncConnection, username="admin", email="admin@example.com", password="admin123"):
     """Create an admin user"""
-    db = SessionLocal()
-    try:
-        # Check if admin user already exists
-        existing_user = db.query(User).filter(User.username == username).first()
-        if existing_user:
-            print(f"✓ Admin user '{username}' already exists")
-            return
-
-        # Create admin user
-        admin_user = User(
+    # Check if admin user already exists
+    # Only the primary key is fetched, so the username index can answer it
+    result = await conn.execute(select(User.id).where(User.username == username))
+    if result.scalar() is not None:
+        print(f"✓ Admin user '{username}' already exists")
+        return
+
+    # Create admin user with a core insert (no ORM unit of work needed)
+    await conn.execute(
+        User.__table__.insert().values(
             username=username,
             email=email,
             hashed_password=get_password_hash(password),
             is_active=True,
             is_superuser=True
         )
-        db.add(admin_user)
-        db.commit()
-        print(f"✓ Admin user created:")
-        print(f"  Username: {username}")
-        print(f"  Email: {email}")
-        print(f"  Password: {password}")
-        print(f"  IMPORTANT: Change this password after first login!")
-    except Exception as e:
-        db.rollback()
-        print(f"✗ Error creating admin user: {e}")
-    finally:
-        db.close()
+    )
+    print(f"✓ Admin user created:")
+    print(f"  Username: {username}")
+    print(f"  Email: {email}")
+    print(f"  Password: {password}")
+    print(f"  IMPORTANT: Change this password after first login!")
 
 
-def main():
+async def main():
     """Main entry point"""
     print("\n=== SVV-LoginPage Database Initialization ===\n")
 
-    # Initialize database
-    init_database()
-
-    # Check if --create-admin flag is provided
-    if "--create-admin" in sys.argv:
-        print("\nCreating admin user...")
-        create_admin_user()
-    else:
-        print("\nSkipping admin user creation.")
-        print("Run with --create-admin to create default admin user")
+    # Tables and the admin user are created in a single transaction
+    try:
+        async with engine.begin() as conn:
+            # Initialize database
+            await init_database(conn)
+
+            # Check if --create-admin flag is provided
+            if "--create-admin" in sys.argv:
+                print("\nCreating admin user...")
+                await create_admin_user(conn)
+            else:
+                print("\nSkipping admin user creation.")
+                print("Run with --create-admin to create default admin user")
+    except Exception as e:
+        print(f"✗ Database initialization failed, nothing was committed: {e}")
+        sys.exit(1)
+    finally:
+        await engine.dispose()
 
     print("\n=== Initialization Complete ===\n")
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
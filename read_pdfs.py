@@ -1,13 +1,21 @@
 import os
-from pypdf import PdfReader
+from concurrent.futures import ProcessPoolExecutor
+import pypdfium2 as pdfium
 
 def extract_text_from_pdf(file_path):
     try:
-        reader = PdfReader(file_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            parts = []
+            for page in pdf:
+                textpage = page.get_textpage()
+                # PDFium reports line breaks as CRLF
+                parts.append(textpage.get_text_range().replace("\r\n", "\n"))
+                textpage.close()
+                page.close()
+            return "\n".join(parts) + "\n"
+        finally:
+            pdf.close()
     except Exception as e:
         return f"Error reading {file_path}: {str(e)}"
 
@@ -19,10 +27,17 @@ pdf_files = [
     "Testing Report.pdf"
 ]
 
-for pdf_file in pdf_files:
-    if os.path.exists(pdf_file):
-        print(f"--- Start of {pdf_file} ---")
-        print(extract_text_from_pdf(pdf_file))
-        print(f"--- End of {pdf_file} ---\n")
-    else:
-        print(f"File not found: {pdf_file}")
+if __name__ == "__main__":
+    existing_files = [pdf_file for pdf_file in pdf_files if os.path.exists(pdf_file)]
+
+    # Extraction is CPU-bound and independent per file, so run files in parallel
+    with ProcessPoolExecutor(max_workers=max(len(existing_files), 1)) as executor:
+        texts = dict(zip(existing_files, executor.map(extract_text_from_pdf, existing_files)))
+
+    for pdf_file in pdf_files:
+        if pdf_file in texts:
+            print(f"--- Start of {pdf_file} ---")
+            print(texts[pdf_file])
+            print(f"--- End of {pdf_file} ---\n")
+        else:
+            print(f"File not found: {pdf_file}")
@@ -53,7 +53,7 @@ echo ""
 
 # Initialize database
 echo "Initializing database tables..."
-python -c "from backend.database import init_db; init_db()"
+python -c "import asyncio; from backend.database import init_db; asyncio.run(init_db())"
 echo -e "${GREEN}✓ Database initialized${NC}"
 echo ""
 
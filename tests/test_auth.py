@@ -7,21 +7,37 @@ Usage:
     pytest tests/test_auth.py -v
 """
 
+import time
+
+import bcrypt
 import pytest
 from fastapi.testclient import TestClient
 from fastapi import status
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from backend.database import Base, get_db
 from backend.models import User
-from backend.auth import get_password_hash
-from backend.api import router
+from backend.auth import clear_auth_caches, get_password_hash
+from backend import api as api_module
+from backend import auth as auth_module
+from backend.api import (
+    check_login_lockout,
+    clear_login_attempts,
+    failed_login_attempts,
+    record_failed_login,
+    router,
+    user_response_cache,
+)
 
 # Create test database engine (in-memory SQLite for testing)
 SQLALCHEMY_TEST_DATABASE_URL = "sqlite:///./test.db"
 test_engine = create_engine(SQLALCHEMY_TEST_DATABASE_URL, connect_args={"check_same_thread": False})
 TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+# The API itself runs on an AsyncSession; it shares the same SQLite file
+test_async_engine = create_async_engine("sqlite+aiosqlite:///./test.db")
+TestAsyncSessionLocal = async_sessionmaker(test_async_engine, autoflush=False, expire_on_commit=False)
 
 
 # Test fixtures
@@ -40,11 +56,9 @@ def db_session():
 @pytest.fixture
 def client(db_session):
     """Create test client with database override"""
-    def override_get_db():
-        try:
-            yield db_session
-        finally:
-            pass
+    async def override_get_db():
+        async with TestAsyncSessionLocal() as session:
+            yield session
 
     from fastapi import FastAPI
     app = FastAPI()
@@ -53,12 +67,40 @@ def client(db_session):
     from backend.database import get_db
     app.dependency_overrides[get_db] = override_get_db
 
+    # Each test recreates the database, so cached users/tokens must not leak across tests
+    clear_auth_caches()
+    user_response_cache.clear()
+    clear_login_attempts()
+
     with TestClient(app) as test_client:
         yield test_client
 
     app.dependency_overrides.clear()
 
 
+@pytest.fixture
+def clean_login_attempts():
+    """Reset the login rate limiter around tests that call it directly"""
+    clear_login_attempts()
+    yield
+    clear_login_attempts()
+
+
+@pytest.fixture
+def verify_calls(monkeypatch):
+    """Enable the login cache and record every real password verification"""
+    monkeypatch.setattr(auth_module, "_LOGIN_CACHE_ENABLED", True)
+    calls = []
+    real_verify = auth_module.verify_password
+
+    def counting_verify(plain_password, hashed_password):
+        calls.append(plain_password)
+        return real_verify(plain_password, hashed_password)
+
+    monkeypatch.setattr(auth_module, "verify_password", counting_verify)
+    return calls
+
+
 def create_test_user(db_session, username="testuser", email="test@example.com", password="testpass"):
     """Helper function to create a test user"""
     user = User(
@@ -82,7 +124,7 @@ class TestRegistration:
         user_data = {
             "username": "newuser",
             "email": "newuser@example.com",
-            "password": "newpass123"
+            "password": "NewPass123!"
         }
 
         response = client.post("/api/auth/register", json=user_data)
@@ -99,7 +141,7 @@ class TestRegistration:
         db_user = db_session.query(User).filter(User.username == "newuser").first()
         assert db_user is not None
         assert db_user.email == "newuser@example.com"
-        assert db_user.hashed_password != "newpass123"  # Should be hashed
+        assert db_user.hashed_password != "NewPass123!"  # Should be hashed
 
     def test_register_duplicate_username(self, client, db_session):
         """Test registration with duplicate username"""
@@ -110,7 +152,7 @@ class TestRegistration:
         user_data = {
             "username": "existing",
             "email": "newemail@example.com",
-            "password": "testpass123"
+            "password": "TestPass123!"
         }
 
         response = client.post("/api/auth/register", json=user_data)
@@ -127,7 +169,38 @@ class TestRegistration:
         user_data = {
             "username": "newuser",
             "email": "existing@example.com",
-            "password": "testpass123"
+            "password": "TestPass123!"
+        }
+
+        response = client.post("/api/auth/register", json=user_data)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Email already registered" in response.json()["detail"]
+
+    def test_register_lowercases_email(self, client, db_session):
+        """Test the email is stored and returned lowercase"""
+        user_data = {
+            "username": "mixedcase",
+            "email": "Mixed.Case@Example.COM",
+            "password": "NewPass123!"
+        }
+
+        response = client.post("/api/auth/register", json=user_data)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["email"] == "mixed.case@example.com"
+
+        db_user = db_session.query(User).filter(User.username == "mixedcase").first()
+        assert db_user.email == "mixed.case@example.com"
+
+    def test_register_duplicate_email_case_variant(self, client, db_session):
+        """Test an email differing only by case counts as a duplicate"""
+        create_test_user(db_session, username="bob", email="bob@x.com")
+
+        user_data = {
+            "username": "otherbob",
+            "email": "Bob@X.com",
+            "password": "TestPass123!"
         }
 
         response = client.post("/api/auth/register", json=user_data)
@@ -135,6 +208,19 @@ class TestRegistration:
         assert response.status_code == status.HTTP_400_BAD_REQUEST
         assert "Email already registered" in response.json()["detail"]
 
+    def test_register_invalid_username(self, client):
+        """Test registration with a username outside the allowed pattern"""
+        user_data = {
+            "username": "bad name!",
+            "email": "newuser@example.com",
+            "password": "NewPass123!"
+        }
+
+        response = client.post("/api/auth/register", json=user_data)
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert response.json()["detail"][0]["type"] == "string_pattern_mismatch"
+
 
 class TestLogin:
     """Test user login endpoint"""
@@ -187,6 +273,141 @@ class TestLogin:
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
         assert "Incorrect username or password" in response.json()["detail"]
 
+    def test_login_upgrades_legacy_bcrypt_hash(self, client, db_session):
+        """Test a legacy bcrypt hash still logs in and is rehashed to argon2id"""
+        password = "testpass123"
+        user = User(
+            username="legacy",
+            email="legacy@example.com",
+            hashed_password=bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=4)).decode(),
+            is_active=True
+        )
+        db_session.add(user)
+        db_session.commit()
+
+        response = client.post("/api/auth/token", data={"username": "legacy", "password": password})
+        assert response.status_code == status.HTTP_200_OK
+
+        db_session.refresh(user)
+        assert user.hashed_password.startswith("$argon2id$")
+
+        # The upgraded hash keeps working
+        response = client.post("/api/auth/token", data={"username": "legacy", "password": password})
+        assert response.status_code == status.HTTP_200_OK
+
+
+class TestLoginCache:
+    """Test the opt-in cache of recently verified logins"""
+
+    def test_repeat_login_hits_cache(self, client, db_session, verify_calls):
+        """Test a repeated correct login skips password verification"""
+        password = "testpass123"
+        create_test_user(db_session, username="cached", password=password)
+
+        for _ in range(2):
+            response = client.post("/api/auth/token", data={"username": "cached", "password": password})
+            assert response.status_code == status.HTTP_200_OK
+
+        assert len(verify_calls) == 1
+
+    def test_wrong_password_never_hits_cache(self, client, db_session, verify_calls):
+        """Test a wrong password is always verified and rejected"""
+        password = "testpass123"
+        create_test_user(db_session, username="cached", password=password)
+
+        client.post("/api/auth/token", data={"username": "cached", "password": password})
+        response = client.post("/api/auth/token", data={"username": "cached", "password": "wrongpass"})
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert verify_calls == [password, "wrongpass"]
+
+    def test_changed_hash_invalidates_entry(self, client, db_session, verify_calls):
+        """Test a cached login stops working once the stored hash changes"""
+        password = "testpass123"
+        user = create_test_user(db_session, username="cached", password=password)
+
+        response = client.post("/api/auth/token", data={"username": "cached", "password": password})
+        assert response.status_code == status.HTTP_200_OK
+
+        user.hashed_password = get_password_hash("newpass456")
+        db_session.commit()
+
+        response = client.post("/api/auth/token", data={"username": "cached", "password": password})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert len(verify_calls) == 2
+
+
+class TestLoginLockout:
+    """Test per-username lockout after repeated failed logins"""
+
+    def _fail_logins(self, client, username, times):
+        for _ in range(times):
+            response = client.post("/api/auth/token", data={"username": username, "password": "wrongpass"})
+            assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_lockout_after_max_failures(self, client, db_session):
+        """Test the attempt after MAX_LOGIN_ATTEMPTS failures is rejected with 429"""
+        password = "testpass123"
+        create_test_user(db_session, username="victim", password=password)
+
+        self._fail_logins(client, "victim", api_module.MAX_LOGIN_ATTEMPTS)
+
+        # Even the correct password is refused while locked out
+        response = client.post("/api/auth/token", data={"username": "victim", "password": password})
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    def test_lockout_expires(self, client, db_session, monkeypatch):
+        """Test login works again once the lockout duration has passed"""
+        password = "testpass123"
+        create_test_user(db_session, username="victim", password=password)
+
+        self._fail_logins(client, "victim", api_module.MAX_LOGIN_ATTEMPTS)
+
+        later = time.time_ns() + api_module.LOCKOUT_DURATION_NS + 1
+        monkeypatch.setattr(time, "time_ns", lambda: later)
+
+        response = client.post("/api/auth/token", data={"username": "victim", "password": password})
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_stale_heap_entry_does_not_unlock_relocked_user(self, clean_login_attempts, monkeypatch):
+        """Test an expired heap entry from an earlier lockout leaves a re-lock in place"""
+        clock = [time.time_ns()]
+        monkeypatch.setattr(time, "time_ns", lambda: clock[0])
+
+        for _ in range(api_module.MAX_LOGIN_ATTEMPTS):
+            record_failed_login("victim")
+        first_deadline = failed_login_attempts["victim"].locked_until
+
+        # First lockout expires while cleanup is throttled: the entry is reset
+        # but its heap entry stays behind
+        clock[0] = first_deadline + 1
+        monkeypatch.setattr(api_module, "_last_cleanup_ns", time.monotonic_ns())
+        assert not check_login_lockout("victim")
+
+        for _ in range(api_module.MAX_LOGIN_ATTEMPTS):
+            record_failed_login("victim")
+        second_deadline = failed_login_attempts["victim"].locked_until
+
+        # Cleanup now pops the stale first entry, which must not clear the re-lock
+        clock[0] = second_deadline - 1
+        monkeypatch.setattr(api_module, "_last_cleanup_ns", 0)
+        assert check_login_lockout("victim")
+
+    def test_overflow_evicts_only_unlocked_entries(self, clean_login_attempts, monkeypatch):
+        """Test overflow eviction drops the oldest unlocked entries and keeps lockouts"""
+        monkeypatch.setattr(api_module, "MAX_TRACKED_USERS", 3)
+
+        for _ in range(api_module.MAX_LOGIN_ATTEMPTS):
+            record_failed_login("locked")
+        for identifier in ("a", "b", "c", "d"):
+            record_failed_login(identifier)
+
+        monkeypatch.setattr(api_module, "_last_cleanup_ns", 0)
+        check_login_lockout("other")
+
+        assert set(failed_login_attempts) == {"locked", "c", "d"}
+        assert check_login_lockout("locked")
+
 
 class TestCurrentUser:
     """Test get current user endpoint"""
@@ -214,6 +435,37 @@ class TestCurrentUser:
         assert response_data["email"] == "test@example.com"
         assert response_data["id"] == user.id
 
+    def test_get_current_user_not_modified(self, client, db_session):
+        """Test that a matching If-None-Match returns 304"""
+        password = "testpass123"
+        create_test_user(db_session, username="testuser", password=password)
+
+        login_response = client.post("/api/auth/token", data={"username": "testuser", "password": password})
+        headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+        response = client.get("/api/auth/users/me", headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        etag = response.headers["ETag"]
+
+        response = client.get("/api/auth/users/me", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_get_current_user_legacy_email(self, client, db_session):
+        """Test a stored email outside the registration pattern is still returned"""
+        password = "testpass123"
+        create_test_user(db_session, username="carol", email="Carol@Exämple.com", password=password)
+
+        login_response = client.post("/api/auth/token", data={"username": "carol", "password": password})
+        token = login_response.json()["access_token"]
+
+        response = client.get(
+            "/api/auth/users/me",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["email"] == "Carol@Exämple.com"
+
     def test_get_current_user_no_token(self, client):
         """Test getting current user without token"""
         response = client.get("/api/auth/users/me")
@@ -230,6 +482,26 @@ class TestCurrentUser:
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
 
+class TestLogout:
+    """Test logout endpoint"""
+
+    def test_logout_revokes_token(self, client, db_session):
+        """Test that a token cannot be reused after logout"""
+        password = "testpass123"
+        create_test_user(db_session, username="testuser", password=password)
+
+        login_response = client.post("/api/auth/token", data={"username": "testuser", "password": password})
+        headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+        assert client.get("/api/auth/users/me", headers=headers).status_code == status.HTTP_200_OK
+
+        response = client.post("/api/auth/logout", headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+
+        client.cookies.clear()
+        response = client.get("/api/auth/users/me", headers=headers)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
 class TestUpdateUser:
     """Test update current user endpoint"""
 
@@ -287,6 +559,26 @@ class TestUpdateUser:
         db_session.refresh(user)
         assert user.username == "newname"
 
+    def test_login_after_username_change(self, client, db_session):
+        """Test the old username stops working once the user is renamed"""
+        password = "testpass123"
+        create_test_user(db_session, username="oldname", password=password)
+
+        login_response = client.post("/api/auth/token", data={"username": "oldname", "password": password})
+        token = login_response.json()["access_token"]
+
+        client.put(
+            "/api/auth/users/me",
+            json={"username": "newname"},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+        response = client.post("/api/auth/token", data={"username": "oldname", "password": password})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        response = client.post("/api/auth/token", data={"username": "newname", "password": password})
+        assert response.status_code == status.HTTP_200_OK
+
     def test_update_user_duplicate_email(self, client, db_session):
         """Test updating to an email that already exists"""
         # Create two users
@@ -309,6 +601,69 @@ class TestUpdateUser:
         assert response.status_code == status.HTTP_400_BAD_REQUEST
         assert "Email already registered" in response.json()["detail"]
 
+    def test_update_user_email_lowercased(self, client, db_session):
+        """Test an updated email is stored lowercase"""
+        password = "testpass123"
+        user = create_test_user(db_session, username="user1", email="user1@example.com", password=password)
+
+        login_response = client.post("/api/auth/token", data={"username": "user1", "password": password})
+        token = login_response.json()["access_token"]
+
+        response = client.put(
+            "/api/auth/users/me",
+            json={"email": "New.Email@Example.COM"},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["email"] == "new.email@example.com"
+
+        db_session.refresh(user)
+        assert user.email == "new.email@example.com"
+
+    def test_update_user_duplicate_email_case_variant(self, client, db_session):
+        """Test updating to a case variant of another user's email"""
+        password = "testpass123"
+        create_test_user(db_session, username="user1", email="user1@example.com", password=password)
+        create_test_user(db_session, username="user2", email="user2@example.com", password=password)
+
+        login_response = client.post("/api/auth/token", data={"username": "user1", "password": password})
+        token = login_response.json()["access_token"]
+
+        response = client.put(
+            "/api/auth/users/me",
+            json={"email": "User2@Example.com"},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Email already registered" in response.json()["detail"]
+
+    def test_update_user_rejected_update_leaves_user_unchanged(self, client, db_session):
+        """Test a rejected update changes nothing and later requests still work"""
+        password = "testpass123"
+        create_test_user(db_session, username="user1", email="user1@example.com", password=password)
+        create_test_user(db_session, username="user2", email="user2@example.com", password=password)
+
+        login_response = client.post("/api/auth/token", data={"username": "user1", "password": password})
+        headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+        # Username is free but the email is taken: nothing may be applied
+        response = client.put(
+            "/api/auth/users/me",
+            json={"username": "newname", "email": "user2@example.com"},
+            headers=headers
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        response = client.get("/api/auth/users/me", headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["username"] == "user1"
+
+        response = client.put("/api/auth/users/me", json={"username": "newname"}, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["username"] == "newname"
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])